@@ -0,0 +1,22 @@
+import json
+import sys
+
+# ==== Constants ====
+INPUT_JSON = "ldd_vdi_data.json"
+OUTPUT_JSONL = "ldd_vdi_data.jsonl"
+
+# ==== Rewrite the legacy hostname-keyed export as one record per line ====
+def convert_to_jsonl(json_file, jsonl_file):
+    with open(json_file) as f:
+        data = json.load(f)
+    with open(jsonl_file, "w") as out:
+        for hostname, info in data.items():
+            out.write(json.dumps({"hostname": hostname, **info}) + "\n")
+    return len(data)
+
+# ==== MAIN ====
+if __name__ == "__main__":
+    json_file = sys.argv[1] if len(sys.argv) > 1 else INPUT_JSON
+    jsonl_file = sys.argv[2] if len(sys.argv) > 2 else OUTPUT_JSONL
+    count = convert_to_jsonl(json_file, jsonl_file)
+    print(f"[✅] Wrote {count} LDD records to {jsonl_file}")
@@ -0,0 +1,604 @@
+"""Shared implementation behind the LDD cleanup notifier entry scripts.
+
+``1.py`` delivers notifications through the mail relay; ``LDD.PY`` and
+``import json.py`` run the same pipeline with a :class:`MockNotifier`.
+"""
+from abc import ABC, abstractmethod
+import argparse
+import json
+import csv
+from datetime import date, datetime, timedelta
+from collections import Counter, defaultdict
+from concurrent.futures import ThreadPoolExecutor
+from email.mime.text import MIMEText
+from functools import lru_cache
+from itertools import islice
+from logging.handlers import QueueHandler, QueueListener
+import logging
+import mmap
+import os
+import queue
+import smtplib
+import socket
+import string
+import sys
+
+try:
+    import ijson  # Optional: streams the VDI export instead of loading it whole
+    _JSON_ERRORS = (ValueError, ijson.JSONError)
+except ImportError:
+    ijson = None
+    _JSON_ERRORS = (ValueError,)
+
+try:
+    import orjson  # Optional: faster parser/serializer for JSON and JSON Lines
+    _loads = orjson.loads
+    _dumps = orjson.dumps
+except ImportError:
+    _loads = json.loads
+
+    def _dumps(obj):
+        return json.dumps(obj, ensure_ascii=False).encode("utf-8")
+
+# Constants
+INPUT_JSON = "ldd_vdi_data.json"  # or "ldd_vdi_data.jsonl" from convert_to_jsonl.py
+INPUT_CSV = "1000158532.jpg.csv"
+OUTPUT_EMAIL_FILE = "ldd_cleanup_emails.jsonl"  # One {"to", "subject", "body"} object per line
+SMTP_SERVER = "mailrelay.troweprice.com"
+SMTP_PORT = 25
+MAIL_FROM = "no-reply@troweprice.com"
+DAYS_LIMIT = 14  # Ignore LDDs used in the last 14 days
+CUTOFF_ISO = (date.today() - timedelta(days=DAYS_LIMIT)).isoformat()  # Last logins before this date are stale
+MAX_CONNS = 8  # Concurrent SMTP connections kept open to the relay
+POOL_WAIT_TIMEOUT = 30  # Seconds to wait for a free pooled connection
+DELIVERY_ERRORS = (OSError, queue.Empty)  # SMTP/socket failures and pool wait timeouts
+SEND_BATCH = 1000  # Messages queued on the pool at a time when streaming
+CSV_SUBJECT = "LDD Cleanup Action Required"
+
+log = logging.getLogger("ldd_cleanup")
+
+def setup_logging(level=logging.INFO, log_file=None):
+    """Send log records to stdout (and optionally a log file) via a queue.
+
+    Worker threads only enqueue records; a single listener thread writes them
+    out. The log file, when given, also receives DEBUG records. Returns the
+    listener and the root handler, for :func:`stop_logging`.
+    """
+    records = queue.Queue(-1)
+    log.setLevel(logging.DEBUG if log_file else level)
+    handler = QueueHandler(records)
+    logging.getLogger().addHandler(handler)
+    formatter = logging.Formatter("%(message)s")
+    console = logging.StreamHandler(sys.stdout)
+    console.setLevel(level)
+    console.setFormatter(formatter)
+    handlers = [console]
+    if log_file:
+        file_handler = logging.FileHandler(log_file, mode="w")
+        file_handler.setFormatter(formatter)
+        handlers.append(file_handler)
+    listener = QueueListener(records, *handlers, respect_handler_level=True)
+    listener.start()
+    return listener, handler
+
+def stop_logging(listener, handler):
+    """Flush queued records and detach the handler added by setup_logging."""
+    listener.stop()
+    logging.getLogger().removeHandler(handler)
+
+# Email templates, compiled once at import
+_BODY_TMPL = string.Template("""Dear $user_name,
+
+Our records indicate that you currently have multiple LDDs assigned to you, and the host "$hostname" has not been accessed since $last_login_date.
+
+As part of our monthly LDD cleanup policy:
+- Only one LDD is permitted unless there's a documented business requirement.
+- LDDs unused for more than $days_limit days are subject to removal.
+
+**Action Required:**
+Please review the contents of the following home directory:  
+$home_dir
+
+If this LDD is no longer needed, kindly raise a request to delete it via the ServiceNow LDD Decommission process. If needed for a valid business reason, please document the justification.
+
+Thank you for your cooperation.
+
+Regards,  
+CDE Ops Team
+""")
+
+_BULK_TMPL = string.Template("""Dear $user_name,
+
+Our records indicate that you currently have multiple LDDs assigned to you, and the following hosts have not been accessed in more than $days_limit days:
+
+$host_lines
+
+As part of our monthly LDD cleanup policy:
+- Only one LDD is permitted unless there's a documented business requirement.
+- LDDs unused for more than $days_limit days are subject to removal.
+
+**Action Required:**
+Please review the contents of the home directories listed above.
+
+If these LDDs are no longer needed, kindly raise a request to delete them via the ServiceNow LDD Decommission process. If any are needed for a valid business reason, please document the justification.
+
+Thank you for your cooperation.
+
+Regards,  
+CDE Ops Team
+""")
+
+_CSV_TMPL = string.Template("""Dear $user,
+
+Our monthly audit shows you currently have multiple Linux Developer Desktops (LDDs) assigned:
+→ Hostnames: $hosts
+
+As part of general housekeeping, users are allowed only one LDD by default. 
+Please review your LDD usage and remove any that are not required.
+
+If there is a justified requirement, please inform the support team.
+
+Otherwise, kindly raise a request to delete the extra LDDs and clean up any unnecessary files from your NFS home directory.
+
+Thank you for your cooperation.
+
+Regards,  
+InfraOps Team
+""")
+
+# Content-Type / MIME-Version / CTE headers of a plain us-ascii MIMEText, built once
+_MIME_PREFIX = "".join(f"{k}: {v}\n" for k, v in MIMEText("").items())
+
+@lru_cache(maxsize=None)
+def get_local_hostname():
+    # smtplib resolves the FQDN for EHLO on every connect; look it up once
+    return socket.getfqdn()
+
+def open_smtp():
+    return smtplib.SMTP(SMTP_SERVER, SMTP_PORT, local_hostname=get_local_hostname())
+
+def open_smtp_pool(size):
+    pool = queue.Queue(maxsize=size)
+    try:
+        for _ in range(size):
+            pool.put(open_smtp())
+    except Exception:
+        close_smtp_pool(pool)
+        raise
+    return pool
+
+def close_smtp_pool(pool):
+    while not pool.empty():
+        conn = pool.get_nowait()
+        try:
+            conn.quit()
+        except (OSError, smtplib.SMTPException):
+            conn.close()
+
+def render_body(user_name, hostname, last_login_date, home_dir):
+    return _BODY_TMPL.substitute(
+        user_name=user_name,
+        hostname=hostname,
+        last_login_date=last_login_date,
+        home_dir=home_dir,
+        days_limit=DAYS_LIMIT
+    )
+
+def render_bulk_body(user_name, ldds):
+    host_lines = "\n".join(
+        f"- {ldd.get('hostname', 'Unknown')} (last accessed {ldd.get('citrix_last_connection_date', 'Unknown')})"
+        f": {ldd.get('home_directory', 'Unknown')}"
+        for ldd in ldds
+    )
+    return _BULK_TMPL.substitute(user_name=user_name, host_lines=host_lines, days_limit=DAYS_LIMIT)
+
+def send_email(server, to, subject, body):
+    head = f"Subject: {subject}\nFrom: {MAIL_FROM}\nTo: {to}\n\n"
+    if head.isascii() and body.isascii() and max(map(len, head.splitlines())) <= 78:
+        # Same bytes MIMEText would produce, without re-walking the MIME machinery;
+        # longer header lines get folded by the email package, so they take that path
+        server.sendmail(MAIL_FROM, [to], _MIME_PREFIX + head + body)
+        return
+
+    msg = MIMEText(body)
+    msg["Subject"] = subject
+    msg["From"] = MAIL_FROM
+    msg["To"] = to
+    server.send_message(msg)
+
+def send_pooled(pool, to, subject, body):
+    conn = pool.get(timeout=POOL_WAIT_TIMEOUT)
+    try:
+        try:
+            send_email(conn, to, subject, body)
+        except smtplib.SMTPServerDisconnected:
+            # Relay dropped this connection; replace the slot and retry once
+            conn.close()
+            conn = open_smtp()
+            send_email(conn, to, subject, body)
+    finally:
+        pool.put(conn)
+
+class Notifier(ABC):
+    """Delivery strategy used by notify_json_users.
+
+    Subclasses implement ``send(to, subject, body)``. ``send_many`` delivers
+    a batch and yields each message with the exception it raised, or None.
+    ``sent_label`` describes a successful delivery in the run log.
+    """
+
+    sent_label = "Email sent to"
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+    def close(self):
+        pass
+
+    @abstractmethod
+    def send(self, to, subject, body):
+        """Deliver one message, raising one of DELIVERY_ERRORS on failure."""
+
+    def send_many(self, messages):
+        for message in messages:
+            try:
+                self.send(*message)
+            except DELIVERY_ERRORS as e:
+                yield message, e
+            else:
+                yield message, None
+
+class RealSMTPNotifier(Notifier):
+    """Sends through a pool of persistent connections to the mail relay."""
+
+    def __init__(self, max_conns=MAX_CONNS):
+        self.max_conns = max_conns
+        self.pool = None
+
+    def _open(self, size):
+        if self.pool is None:
+            self.pool = open_smtp_pool(min(self.max_conns, size))
+
+    def close(self):
+        if self.pool is not None:
+            close_smtp_pool(self.pool)
+            self.pool = None
+
+    def send(self, to, subject, body):
+        self._open(1)
+        send_pooled(self.pool, to, subject, body)
+
+    def send_many(self, messages):
+        # Work through the messages in batches so a streamed source stays bounded
+        messages = iter(messages)
+        while True:
+            batch = list(islice(messages, SEND_BATCH))
+            if not batch:
+                return
+            self._open(len(batch))
+            with ThreadPoolExecutor(max_workers=self.pool.maxsize) as executor:
+                futures = [executor.submit(send_pooled, self.pool, *message) for message in batch]
+                for message, future in zip(batch, futures):
+                    try:
+                        future.result()
+                    except DELIVERY_ERRORS as e:
+                        yield message, e
+                    else:
+                        yield message, None
+
+class MockNotifier(Notifier):
+    """Logs each message instead of sending it."""
+
+    sent_label = "Simulated sending email to"
+
+    def send(self, to, subject, body):
+        log.info("\n[MOCK EMAIL]\nTo: %s\nSubject: %s\nBody:\n%s", to, subject, body)
+
+class DryRunNotifier(Notifier):
+    """Renders messages without building MIME or touching SMTP.
+
+    Messages go to the run log, in order with the other records, unless a
+    separate ``out`` stream (e.g. a file) is given.
+    """
+
+    sent_label = "Would send email to"
+
+    def __init__(self, out=None):
+        self.out = out
+
+    def close(self):
+        if self.out is not None:
+            self.out.flush()
+
+    def send(self, to, subject, body):
+        text = f"--- {to} ---\n{subject}\n{body}"
+        if self.out is None:
+            log.info("%s", text)
+        else:
+            self.out.write(text + "\n\n")
+
+def should_notify(ldd, _cutoff=CUTOFF_ISO):
+    # ISO-8601 dates order lexicographically, so a string compare is enough;
+    # anything that is not a YYYY-MM-DD string (missing, numeric, malformed) is
+    # treated as an unknown (stale) login. s[4::3] is the two dashes, and the
+    # cutoff is bound as a default to save a global lookup per record.
+    s = ldd.get("citrix_last_connection_date")
+    return not isinstance(s, str) or len(s) != 10 or s[4::3] != "--" or s < _cutoff
+
+def load_jsonl(jsonl_file):
+    """Yield one LDD record per non-empty line of a JSON Lines feed."""
+    with open(jsonl_file, "rb") as f:
+        for line in f:
+            if line.strip():
+                yield _loads(line)
+
+def _is_jsonl(json_file):
+    return json_file.endswith(".jsonl")
+
+def ldds_stream(json_file):
+    """Whether iter_ldds reads ``json_file`` a record at a time, not whole."""
+    return _is_jsonl(json_file) or ijson is not None
+
+def iter_ldds(json_file):
+    """Yield (hostname, info) pairs from the VDI export one record at a time.
+
+    ``.jsonl`` feeds are read line by line; anything else is treated as the
+    legacy export, a single object keyed by hostname.
+    """
+    if _is_jsonl(json_file):
+        for info in load_jsonl(json_file):
+            yield info.get("hostname"), info
+    elif ijson is None:
+        with open(json_file, "rb") as f:
+            yield from _loads(f.read()).items()
+    else:
+        with open(json_file, "rb") as f:
+            yield from ijson.kvitems(f, "", use_float=True)
+
+def _parse_csv_line(line):
+    return next(csv.reader([line.decode("utf-8")]), [])
+
+def _header_columns(csv_file, header):
+    if "User" not in header or "Hostname List" not in header:
+        raise ValueError(f"{csv_file} has no User/Hostname List header")
+    return header.index("User"), header.index("Hostname List")
+
+def _read_user_hostnames(csv_file):
+    # Plain csv.reader over the text file, for line endings the mmap scan can't split
+    with open(csv_file, newline="", encoding="utf-8") as f:
+        reader = csv.reader(f)
+        u, h = _header_columns(csv_file, next(reader, []))
+        for row in reader:
+            if len(row) > max(u, h):
+                yield row[u], row[h]
+
+def _iter_user_hostnames(csv_file):
+    """Yield raw (User, Hostname List) values from the hostname CSV.
+
+    The file is memory-mapped and scanned line by line. When Hostname List is
+    the last column and the columns before it are unquoted, a row is split on
+    its first commas and only the two needed fields are decoded; any other
+    row shape falls back to csv.reader for that line. Files with CR-only line
+    endings are read with csv.reader throughout.
+    """
+    with open(csv_file, "rb") as f:
+        if os.fstat(f.fileno()).st_size == 0:
+            return  # mmap can't map an empty file; there are simply no users
+        with mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as mm:
+            size = mm.size()
+            end = mm.find(b"\n")
+            if end == -1:
+                end = size
+            first = mm[:end].rstrip(b"\r")
+            if b"\r" in first:
+                yield from _read_user_hostnames(csv_file)
+                return
+            header = _parse_csv_line(first)
+            u, h = _header_columns(csv_file, header)
+            fast = h == len(header) - 1 and u < h
+            pos = end + 1
+            while pos < size:
+                end = mm.find(b"\n", pos)
+                if end == -1:
+                    end = size
+                line = mm[pos:end].rstrip(b"\r")
+                pos = end + 1
+                if not line:
+                    continue
+                if fast:
+                    fields = line.split(b",", h)
+                    if len(fields) == h + 1 and b'"' not in line[:len(line) - len(fields[h])]:
+                        raw = fields[h]
+                        if raw[:1] == b'"' and raw[-1:] == b'"' and b'"' not in raw[1:-1]:
+                            raw = raw[1:-1]
+                        elif b'"' in raw or b"," in raw:
+                            raw = None
+                        if raw is not None:
+                            yield fields[u].decode("utf-8"), raw.decode("utf-8")
+                            continue
+                row = _parse_csv_line(line)
+                if len(row) > max(u, h):
+                    yield row[u], row[h]
+
+def load_csv_users(csv_file):
+    users = {}
+    for user, hostnames_raw in _iter_user_hostnames(csv_file):
+        if "," not in hostnames_raw:
+            continue  # A single host can never be a multi-LDD user
+        user = sys.intern(user.strip())
+        # Dedup while keeping export order; repeated hosts don't count twice
+        hostnames = dict.fromkeys(sys.intern(x.strip()) for x in hostnames_raw.split(","))
+        hostnames.pop("", None)
+        if user and len(hostnames) > 1:
+            users[user] = list(hostnames)
+    log.info("[INFO] Loaded %d users with multiple LDDs from CSV.", len(users))
+    return users
+
+_STRIP_COMMAS = str.maketrans("", "", ",")
+
+@lru_cache(maxsize=4096)
+def _derive_email(owner_email, owner_name):
+    # Interned so every record of an owner shares one key object in the user maps
+    if owner_email:
+        return sys.intern(owner_email)
+    if owner_name:
+        parts = owner_name.translate(_STRIP_COMMAS).split()
+        if len(parts) >= 2:
+            last = parts[0].lower()
+            first = parts[1].lower()
+            return sys.intern(f"{first}.{last}@troweprice.com")
+    return None
+
+def get_user_email(vdi_entry):
+    # Owners repeat across hosts, so the name-to-address derivation is cached
+    return _derive_email(vdi_entry.get("vdi_owner_email"), vdi_entry.get("vdi_owner_name"))
+
+def group_by_user(json_file):
+    """Map owner email to its LDD records, for owners with more than one LDD."""
+    if not ldds_stream(json_file):
+        # Every pass would parse the whole export, so group in one pass and
+        # drop single-LDD owners at the end
+        user_map = defaultdict(list)
+        for _, info in iter_ldds(json_file):
+            email = get_user_email(info)
+            if email:
+                user_map[email].append(info)
+        for email in [email for email, ldds in user_map.items() if len(ldds) == 1]:
+            log.debug("[SKIPPED] %s - only 1 LDD", email)
+            del user_map[email]
+        return user_map
+
+    # Pass 1: count LDDs per owner so single-LDD owners are never buffered
+    counts = Counter()
+    for _, info in iter_ldds(json_file):
+        email = get_user_email(info)
+        if email:
+            counts[email] += 1
+    interesting = set()
+    for email, count in counts.items():
+        if count > 1:
+            interesting.add(email)
+        else:
+            log.debug("[SKIPPED] %s - only 1 LDD", email)
+
+    # Pass 2: keep only the records of owners with more than one LDD
+    user_map = defaultdict(list)
+    if interesting:
+        for _, info in iter_ldds(json_file):
+            email = get_user_email(info)
+            if email in interesting:
+                user_map[email].append(info)
+    return user_map
+
+def _per_host_message(email, ldd):
+    hostname = ldd.get("hostname", "Unknown")
+    return (
+        email,
+        f"[ACTION REQUIRED] LDD Cleanup for Host {hostname}",
+        render_body(
+            user_name=ldd.get("vdi_owner_name", "User"),
+            hostname=hostname,
+            last_login_date=ldd.get("citrix_last_connection_date", "Unknown"),
+            home_dir=ldd.get("home_directory", "Unknown")
+        )
+    ), f"host {hostname}"
+
+def _bulk_message(email, ldds):
+    hostnames = [ldd.get("hostname", "Unknown") for ldd in ldds]
+    return (
+        email,
+        f"[ACTION REQUIRED] LDD Cleanup for {len(ldds)} Hosts",
+        render_bulk_body(ldds[0].get("vdi_owner_name", "User"), ldds)
+    ), "hosts " + ", ".join(hostnames)
+
+def notify_json_users(json_file, notifier, per_host=False):
+    """Email owners with more than one LDD about their stale hosts.
+
+    An owner with several stale hosts gets a single email listing all of them,
+    unless ``per_host`` asks for the old one-email-per-host behaviour.
+    """
+    log.debug("\n==== Processing JSON Data ====")
+    messages = []
+    labels = []
+    for email, ldds in group_by_user(json_file).items():
+        stale = []
+        for ldd in ldds:
+            if should_notify(ldd):
+                stale.append(ldd)
+            else:
+                log.debug("[SKIPPED] %s - Host %s accessed recently", email, ldd.get("hostname", "Unknown"))
+        if not per_host and len(stale) > 1:
+            built = [_bulk_message(email, stale)]
+        else:
+            built = [_per_host_message(email, ldd) for ldd in stale]
+        for message, label in built:
+            messages.append(message)
+            labels.append(label)
+
+    for label, ((email, _, _), error) in zip(labels, notifier.send_many(messages)):
+        if error is None:
+            log.info("[✅] %s %s for %s", notifier.sent_label, email, label)
+        else:
+            log.error("[❌] Failed to send email to %s for %s: %s", email, label, error)
+
+def generate_email(user, hostnames):
+    return _CSV_TMPL.substitute(user=user, hosts=", ".join(hostnames))
+
+def write_emails_from_csv(csv_users, output_file):
+    """Write one {"to", "subject", "body"} JSON object per line for each user."""
+    log.debug("\n==== Processing CSV Data ====")
+    chunks = []
+    for user, hostnames in csv_users.items():
+        log.debug("[INFO] Email generated for CSV user: %s", user)
+        chunks.append(_dumps({"to": user, "subject": CSV_SUBJECT, "body": generate_email(user, hostnames)}))
+        chunks.append(b"\n")
+    with open(output_file, "wb", buffering=1 << 20) as f:
+        f.write(b"".join(chunks))
+    log.info("[✅] All emails written to %s", output_file)
+
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(description="LDD cleanup notifier")
+    parser.add_argument(
+        "--input", default=INPUT_JSON,
+        help=f"VDI export to read (default: {INPUT_JSON}); a .jsonl feed from convert_to_jsonl.py also works"
+    )
+    parser.add_argument(
+        "--per-host", action="store_true",
+        help="send one email per stale host instead of one per owner"
+    )
+    parser.add_argument(
+        "--dry-run", action="store_true",
+        help="write rendered emails to stdout instead of delivering them"
+    )
+    return parser.parse_args(argv)
+
+def run(notifier, log_file=None, per_host=False, input_json=INPUT_JSON):
+    """Notify owners from the VDI export, then write the CSV audit emails."""
+    listener, handler = setup_logging(log_file=log_file)
+    try:
+        log.info("[INFO] Starting LDD Cleanup Notifier...")
+        log.debug("=== LDD Cleanup Log started @ %s ===", datetime.now())
+
+        # 1. Process JSON-based LDDs; OSError also covers relay connection failures
+        try:
+            with notifier:
+                notify_json_users(input_json, notifier, per_host=per_host)
+        except (OSError,) + _JSON_ERRORS as e:
+            log.error("[ERROR] Failed to process JSON: %s", e)
+
+        # 2. Process CSV-based LDDs
+        try:
+            # Clear the previous run's emails first so a bad CSV can't leave
+            # them behind for send_from_jsonl.py to resend
+            open(OUTPUT_EMAIL_FILE, "wb").close()
+            csv_users = load_csv_users(INPUT_CSV)
+            write_emails_from_csv(csv_users, OUTPUT_EMAIL_FILE)
+        except (OSError, ValueError, csv.Error) as e:
+            log.error("[ERROR] Failed to process CSV: %s", e)
+        if log_file:
+            log.info("[INFO] Logs written to %s", log_file)
+    finally:
+        stop_logging(listener, handler)
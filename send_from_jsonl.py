@@ -0,0 +1,21 @@
+import sys
+
+from ldd_core import OUTPUT_EMAIL_FILE, RealSMTPNotifier, load_jsonl, log, setup_logging, stop_logging
+
+# ==== MAIN: stream the CSV audit emails written by run() into the SMTP pool ====
+if __name__ == "__main__":
+    jsonl_file = sys.argv[1] if len(sys.argv) > 1 else OUTPUT_EMAIL_FILE
+    listener, handler = setup_logging()
+    try:
+        messages = ((m["to"], m["subject"], m["body"]) for m in load_jsonl(jsonl_file))
+        try:
+            with RealSMTPNotifier() as notifier:
+                for (to, _, _), error in notifier.send_many(messages):
+                    if error is None:
+                        log.info("[✅] Email sent to %s", to)
+                    else:
+                        log.error("[❌] Failed to send email to %s: %s", to, error)
+        except (OSError, ValueError) as e:
+            log.error("[ERROR] Failed to send %s: %s", jsonl_file, e)
+    finally:
+        stop_logging(listener, handler)